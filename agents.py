@@ -0,0 +1,140 @@
+import os
+from functools import lru_cache
+
+"""
+Azure OpenAI services and agents shared by every app.
+
+Nothing is imported or constructed until an app first asks for it, and every
+service and agent is built once per process: all agents on the same
+deployment share one AzureChatCompletion (and one underlying HTTP client)
+instead of each building their own. This keeps cold start low for
+scale-to-zero deployments.
+"""
+
+DEFAULT_DEPLOYMENT_NAME = 'gpt-4.1'
+
+FILTERED_QUERY_INSTRUCTIONS = (
+    "You are an AI assistant specialized for searching knowledge articles. "
+    "For every user message, you MUST extract two parameters—'query' and 'filtered_query'—and IMMEDIATELY INVOKE the AiSearchBoth plugin with these parameters as a function call. "
+    "You MUST NOT respond in text, chat, markdown, or JSON—your ONLY valid action is to call the AiSearchBoth tool. "
+    "Never write, display, or explain what you are doing—just call the plugin.\n"
+    "\n"
+    "Details:\n"
+    "- query: a concise natural language search phrase (from the user message)\n"
+    "- filtered_query: an OData filter string for explicit constraints (date, claps, responses, publication, reading_time), or null if no filters are needed\n"
+    "- Dates must be formatted as YYYY-MM-DDT00:00:00Z\n"
+    "- String values in filtered_query must use single quotes (e.g., publication eq 'Better Humans')\n"
+    "\n"
+    "Examples:\n"
+    "User: Show me articles about productivity from Better Humans after May 10, 2020 with at least 1000 claps.\n"
+    "You MUST call: AiSearchBoth(query='articles about productivity from Better Humans', filtered_query=\"publication eq 'Better Humans' and date gt 2020-05-10T00:00:00Z and claps ge 1000\")\n"
+    "\n"
+    "User: Summarize articles about sleep improvement from UX Collective publication with more than 150 claps and less than 10 reading time.\n"
+    "You MUST call: AiSearchBoth(query='articles about sleep improvement', filtered_query='publication eq 'UX Collective' and claps ge 150 and reading_time le 20')\n"
+    "\n"
+    "Repeat: Never respond to the user with JSON or text. Your ONLY action is to invoke the AiSearchBoth plugin/function/tool using the arguments you extract."
+)
+
+# Appended for agents that also answer count/stat questions (see get_filtered_query_agent).
+AGGREGATE_INSTRUCTIONS = (
+    "\n\n"
+    "Exception: if the user asks for numbers about articles rather than the articles themselves (how many, totals, averages, minimum/maximum, distributions or most common publications), "
+    "call the AiSearchAggregate functions (count_articles, top_values, histogram, field_stats) instead of AiSearchBoth, with the same filtered_query rules. "
+    "Answer with the numbers they return."
+)
+
+
+def openai_http_library():
+    """The HTTP library the openai SDK is built on: httpx, or its httpx2 fork in newer releases."""
+    import importlib
+    from openai import DefaultAsyncHttpxClient
+
+    client_class = next(cls for cls in DefaultAsyncHttpxClient.__mro__ if cls.__name__ == "AsyncClient")
+    return importlib.import_module(client_class.__module__.split(".")[0])
+
+
+def make_openai_client(transport=None, upstream=None):
+    """
+    AsyncAzureOpenAI whose every HTTP request goes through `upstream`
+    (openai_upstream by default), on top of `transport` (the network).
+    """
+    from openai import AsyncAzureOpenAI, DefaultAsyncHttpxClient
+    from plugins.resilience import UpstreamTransport, openai_upstream
+
+    # Timeouts, retries and the circuit breaker for Azure OpenAI are owned by
+    # plugins/resilience.py and applied per request by UpstreamTransport, so
+    # they also cover agents invoked as tools. The SDK gets no retries of its own.
+    upstream = upstream or openai_upstream
+    return AsyncAzureOpenAI(
+        azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
+        api_key=os.getenv("AZURE_OPENAI_API_KEY"),
+        api_version=os.getenv("AZURE_OPENAI_API_VERSION"),
+        timeout=upstream.timeout,
+        max_retries=0,
+        http_client=DefaultAsyncHttpxClient(
+            transport=UpstreamTransport(upstream, transport or openai_http_library().AsyncHTTPTransport())
+        ),
+    )
+
+
+@lru_cache(maxsize=None)
+def get_openai_client():
+    """One AsyncAzureOpenAI client (and connection pool) for the whole process."""
+    return make_openai_client()
+
+
+@lru_cache(maxsize=None)
+def get_chat_service(deployment_name: str = DEFAULT_DEPLOYMENT_NAME):
+    """The AzureChatCompletion for `deployment_name`, built on first use and shared afterwards."""
+    from semantic_kernel.connectors.ai.open_ai import AzureChatCompletion
+
+    return AzureChatCompletion(
+        deployment_name=deployment_name,
+        api_key=os.getenv("AZURE_OPENAI_API_KEY"),
+        endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
+        api_version=os.getenv("AZURE_OPENAI_API_VERSION"),
+        async_client=get_openai_client(),
+    )
+
+
+@lru_cache(maxsize=None)
+def get_filtered_query_agent(with_aggregates: bool = False):
+    """
+    Converts a NL query to a filtered query and invokes the AiSearchBoth plugin.
+    With `with_aggregates`, count/stat questions go to the AiSearchAggregate
+    plugin instead, so no documents are retrieved for them.
+    """
+    from semantic_kernel.agents import ChatCompletionAgent
+    from semantic_kernel.connectors.ai.function_choice_behavior import FunctionChoiceBehavior
+    from plugins.ai_search_both import AiSearchBoth
+
+    instructions = FILTERED_QUERY_INSTRUCTIONS
+    plugins = [AiSearchBoth()]
+    included_functions = ["AiSearchBoth-ai_search_both"]
+    if with_aggregates:
+        from plugins.ai_search_aggregate import AiSearchAggregate
+
+        instructions += AGGREGATE_INSTRUCTIONS
+        plugins.append(AiSearchAggregate())
+        included_functions += [
+            f"AiSearchAggregate-{name}" for name in ("count_articles", "top_values", "histogram", "field_stats")
+        ]
+
+    return ChatCompletionAgent(
+        service=get_chat_service(),
+        name="FilteredQueryAgent",
+        instructions=instructions,
+        plugins=plugins,
+        function_choice_behavior=FunctionChoiceBehavior.Required(
+            auto_invoke=True,
+            filters={"included_functions": included_functions},
+        ),
+    )
+
+
+def degraded_response(user_input: str, exc: Exception) -> str:
+    """Answer with hybrid-only search results when Azure OpenAI is unavailable."""
+    from plugins.ai_search_hybrid import AiSearchHybrid
+
+    print(f"    Azure OpenAI unavailable ({exc!r}), falling back to hybrid-only search.")
+    return AiSearchHybrid().ai_search(user_input)
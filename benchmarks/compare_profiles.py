@@ -0,0 +1,81 @@
+import argparse
+import statistics
+import sys
+import os
+import time
+
+# Add the repo root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from dotenv import load_dotenv
+
+# Load environment variables (keys, endpoint, etc.) before the profiles are read
+load_dotenv()
+
+from plugins.resilience import Upstream, search_upstream
+from plugins.search_engine import PROFILES, SearchEngine, get_profile
+
+"""
+A/B benchmark of search profiles against the live Azure AI Search index.
+Every profile runs the same queries through its own non-hedged upstream, so
+one profile's latencies never shape another's hedge delay and the numbers are
+single-request latencies. The script reports latency percentiles and how much
+each profile's results overlap with the first profile's, run by run.
+
+    python benchmarks/compare_profiles.py both hybrid_filtered_vs2 --runs 5
+    AZURE_SEARCH_PROFILES_FILE=profiles.json python benchmarks/compare_profiles.py both both_k10
+"""
+
+DEFAULT_QUERIES = [
+    ("articles about productivity or attention", "publication eq 'Better Humans' and claps ge 1000"),
+    ("articles about sleep improvement", "publication eq 'UX Collective' and claps ge 150"),
+    ("learning python quickly", None),
+    ("machine learning in production", "date ge 2020-01-01T00:00:00Z and reading_time le 10"),
+]
+
+
+def run_profile(name: str, queries: list, runs: int):
+    upstream = Upstream(f"benchmark-{name}", timeout=search_upstream.timeout, hedge=False)
+    engine = SearchEngine(get_profile(name), upstream=upstream)
+    latencies = []
+    results = {}
+    for query, filter_query in queries:
+        results[(query, filter_query)] = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            docs = engine.search(query, filter=filter_query)
+            latencies.append(time.perf_counter() - start)
+            results[(query, filter_query)].append([str(doc.get(engine.profile.key_field)) for doc in docs])
+    return latencies, results
+
+
+def overlap(a: list, b: list) -> float:
+    if not a and not b:
+        return 1.0
+    return len(set(a) & set(b)) / max(len(a), len(b))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="A/B benchmark of search profiles against the live index.")
+    parser.add_argument("profiles", nargs="+", help=f"profile names, known: {sorted(PROFILES)}")
+    parser.add_argument("--runs", type=int, default=3, help="runs per query and profile")
+    args = parser.parse_args()
+
+    baseline = None
+    print(f"{'profile':<24} {'p50 ms':>8} {'p95 ms':>8} {'overlap':>8}")
+    for name in args.profiles:
+        latencies, results = run_profile(name, DEFAULT_QUERIES, args.runs)
+        if baseline is None:
+            baseline = results
+        agreement = statistics.mean(
+            overlap(baseline_ids, ids)
+            for key, runs in results.items()
+            for baseline_ids, ids in zip(baseline[key], runs)
+        )
+        p50 = statistics.median(latencies) * 1000
+        p95 = statistics.quantiles(latencies, n=20)[-1] * 1000 if len(latencies) > 1 else p50
+        print(f"{name:<24} {p50:>8.0f} {p95:>8.0f} {agreement:>8.0%}")
+
+
+if __name__ == "__main__":
+    main()
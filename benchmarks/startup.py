@@ -0,0 +1,93 @@
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import os
+
+"""
+Cold start benchmark for the apps. Every run is a fresh interpreter, like a
+scale-to-zero container starting up, and measures:
+- import: `import app_x` (modules loaded, seconds)
+- build: building the app's entry agent and everything it needs, no network
+- first response (--live only): the first agent turn against Azure OpenAI
+
+    python benchmarks/startup.py --runs 5
+    python benchmarks/startup.py app_single_agent --live
+"""
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# App module -> call that builds the agent its chat loop talks to
+ENTRY_AGENTS = {
+    "app_single_agent": "get_filtered_query_agent(with_aggregates=True)",
+    "app_multi_agent_2agents": "get_main_search_agent()",
+    "app_multi_agent_3agents": "get_main_search_agent()",
+}
+
+CHILD = """
+import asyncio, json, sys, time
+start = time.perf_counter()
+modules_before = len(sys.modules)
+import {app} as app
+import_seconds = time.perf_counter() - start
+modules = len(sys.modules) - modules_before
+
+start = time.perf_counter()
+agent = app.{builder}
+build_seconds = time.perf_counter() - start
+
+first_response_seconds = None
+if {live}:
+    async def first_response():
+        return await app.agent_turn_upstream.call_async(agent.get_response, messages={question!r})
+    start = time.perf_counter()
+    asyncio.run(first_response())
+    first_response_seconds = time.perf_counter() - start
+
+print(json.dumps({{"import": import_seconds, "modules": modules, "build": build_seconds,
+                  "first_response": first_response_seconds}}))
+"""
+
+# Building agents needs credentials to be set, not valid, so offline runs use placeholders.
+PLACEHOLDER_ENV = {
+    "AZURE_OPENAI_ENDPOINT": "https://placeholder.openai.azure.com",
+    "AZURE_OPENAI_API_KEY": "placeholder",
+    "AZURE_OPENAI_API_VERSION": "2024-10-21",
+}
+
+
+def measure(app: str, live: bool, question: str) -> dict:
+    env = dict(os.environ)
+    if not live:
+        for key, value in PLACEHOLDER_ENV.items():
+            env.setdefault(key, value)
+    code = CHILD.format(app=app, builder=ENTRY_AGENTS[app], live=live, question=question)
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold start benchmark: import, agent build and first response latency.")
+    parser.add_argument("apps", nargs="*", default=list(ENTRY_AGENTS), help=f"apps to measure, known: {list(ENTRY_AGENTS)}")
+    parser.add_argument("--runs", type=int, default=3, help="fresh interpreters per app")
+    parser.add_argument("--live", action="store_true", help="also time the first agent turn against Azure OpenAI")
+    parser.add_argument("--question", default="Find articles about boosting productivity with sleep science.")
+    args = parser.parse_args()
+
+    print(f"{'app':<26} {'modules':>8} {'import ms':>10} {'build ms':>9} {'first resp ms':>14}")
+    for app in args.apps:
+        runs = [measure(app, args.live, args.question) for _ in range(args.runs)]
+        first = [r["first_response"] for r in runs if r["first_response"] is not None]
+        print(
+            f"{app:<26} {runs[0]['modules']:>8} "
+            f"{statistics.median(r['import'] for r in runs) * 1000:>10.0f} "
+            f"{statistics.median(r['build'] for r in runs) * 1000:>9.0f} "
+            f"{(f'{statistics.median(first) * 1000:.0f}' if first else '-'):>14}"
+        )
+
+
+if __name__ == "__main__":
+    main()
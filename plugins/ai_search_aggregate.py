@@ -0,0 +1,26 @@
+import json
+from semantic_kernel.functions import kernel_function
+from plugins.search_aggregations import SearchAggregator
+
+
+class AiSearchAggregate:
+    def __init__(self, profile: str = "both"):
+        self.aggregator = SearchAggregator(profile)
+
+    @kernel_function(name="count_articles", description="Count the articles matching an optional OData filter, e.g. \"publication eq 'Better Humans' and claps gt 1000\". Returns only the number, no documents.")
+    def count_articles(self, filtered_query: str | None = None) -> str:
+        return json.dumps({"count": self.aggregator.count(filtered_query)})
+
+    @kernel_function(name="top_values", description="Most frequent values of a field (publication, claps, responses or reading_time) with their article counts, for articles matching an optional OData filter.")
+    def top_values(self, field: str, filtered_query: str | None = None, top_k: int = 10) -> str:
+        values = self.aggregator.top_values(field, filter=filtered_query, k=top_k)
+        return json.dumps([{"value": value, "count": count} for value, count in values])
+
+    @kernel_function(name="histogram", description="Article counts per bucket of claps, responses or reading_time (interval is a positive whole number, e.g. 500), for articles matching an optional OData filter. Dates cannot be bucketed.")
+    def histogram(self, field: str, interval: int, filtered_query: str | None = None) -> str:
+        buckets = self.aggregator.histogram(field, interval, filter=filtered_query)
+        return json.dumps([{"from": start, "count": count} for start, count in buckets], default=str)
+
+    @kernel_function(name="field_stats", description="count, min, max, average and sum of claps, responses or reading_time for articles matching an optional OData filter, optionally grouped by publication (group_by='publication'). Scans at most 100,000 articles and reports 'truncated' when it hit that cap.")
+    def field_stats(self, field: str, filtered_query: str | None = None, group_by: str | None = None) -> str:
+        return json.dumps(self.aggregator.stats(field, filter=filtered_query, group_by=group_by))
@@ -0,0 +1,526 @@
+import asyncio
+import contextvars
+import email.utils
+import os
+import random
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+
+"""
+Shared resilience layer for the upstream services the agents depend on
+(Azure AI Search and Azure OpenAI).
+
+Every call made through an Upstream gets:
+- a deadline, propagated through a context variable so that the agent turn,
+  the plugin it invokes and the search requests underneath share one budget
+- a hedged duplicate request once the call runs past the observed p95 latency
+  of the same kind of request (operation)
+- retries with full jitter on 429/503, honoring Retry-After when it is sent
+- a circuit breaker that fails fast (or into a caller supplied fallback)
+  while the upstream keeps failing
+"""
+
+RETRYABLE_STATUS_CODES = {429, 503}
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when the propagated deadline runs out before the upstream answers."""
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised when an upstream's circuit breaker is open and no fallback was given."""
+
+
+_current_deadline = contextvars.ContextVar("upstream_deadline", default=None)
+
+
+class Deadline:
+    def __init__(self, seconds: float):
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0.0
+
+
+def current_deadline() -> Deadline | None:
+    return _current_deadline.get()
+
+
+def remaining_time(default: float | None = None) -> float | None:
+    """Seconds left on the current deadline, or `default` when no deadline is set."""
+    deadline = _current_deadline.get()
+    return deadline.remaining() if deadline else default
+
+
+@contextmanager
+def deadline_scope(seconds: float):
+    """
+    Run the enclosed block under a deadline of `seconds`.
+    A nested scope can only shorten the deadline of its parent, never extend it.
+    """
+    deadline = Deadline(seconds)
+    parent = _current_deadline.get()
+    if parent is not None and parent.expires_at < deadline.expires_at:
+        deadline = parent
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def _exception_chain(exc: BaseException):
+    """`exc` and the errors it wraps. Semantic Kernel, for one, re-raises every OpenAI error `from` it."""
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        yield exc
+        exc = exc.__cause__ or exc.__context__
+
+
+def status_code_of(exc: Exception) -> int | None:
+    """HTTP status of an Azure SDK / OpenAI SDK error, also when it is wrapped in another exception."""
+    for error in _exception_chain(exc):
+        status = getattr(error, "status_code", None)
+        if status is None:
+            status = getattr(getattr(error, "response", None), "status_code", None)
+        if status is not None:
+            return status
+    return None
+
+
+def _retry_after_header(headers) -> float | None:
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms is not None:
+        try:
+            return float(retry_after_ms) / 1000.0
+        except ValueError:
+            pass
+    retry_after = headers.get("Retry-After")
+    if retry_after is None:
+        return None
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(retry_after)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+def retry_after_of(exc: Exception) -> float | None:
+    """Seconds to wait according to the retry-after-ms / Retry-After response headers."""
+    for error in _exception_chain(exc):
+        headers = getattr(getattr(error, "response", None), "headers", None)
+        if headers:
+            retry_after = _retry_after_header(headers)
+            if retry_after is not None:
+                return retry_after
+    return None
+
+
+def _transport_error_types() -> tuple:
+    """
+    Status-less errors that still mean the upstream is unhealthy. The SDK
+    types are only looked up when their module is already loaded, so this
+    never imports an SDK (an error from an SDK that was never imported
+    cannot be raised anyway).
+    """
+    types = [DeadlineExceeded, CircuitOpenError]
+    azure_exceptions = sys.modules.get("azure.core.exceptions")
+    if azure_exceptions is not None:
+        types += [azure_exceptions.ServiceRequestError, azure_exceptions.ServiceResponseError]
+    openai = sys.modules.get("openai")
+    if openai is not None:
+        types.append(openai.APIConnectionError)  # also covers APITimeoutError
+    return tuple(types)
+
+
+def _is_upstream_failure_status(status: int) -> bool:
+    return status in RETRYABLE_STATUS_CODES or status >= 500
+
+
+def is_upstream_failure(exc: Exception) -> bool:
+    """
+    True when the error says something about the health of the upstream:
+    throttling, 5xx, timeouts and transport errors. Client errors such as a
+    400 for a malformed OData filter are the caller's fault and are not, and
+    neither are programming errors (AttributeError, TypeError, ...).
+    """
+    status = status_code_of(exc)
+    if status is not None:
+        return _is_upstream_failure_status(status)
+    transport_errors = _transport_error_types()
+    return any(isinstance(error, transport_errors) for error in _exception_chain(exc))
+
+
+class RetryPolicy:
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.25, max_delay: float = 4.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def should_retry(self, exc: Exception, attempt: int) -> bool:
+        return attempt < self.max_attempts and status_code_of(exc) in RETRYABLE_STATUS_CODES
+
+    def delay(self, exc: Exception, attempt: int) -> float:
+        """Retry-After when the upstream sent one, otherwise exponential backoff with full jitter."""
+        retry_after = retry_after_of(exc)
+        if retry_after is not None:
+            return retry_after
+        return random.uniform(0.0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies, used to pick the hedging delay."""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._samples)
+
+    def percentile(self, p: float) -> float | None:
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(round(p / 100.0 * (len(ordered) - 1))))
+        return ordered[index]
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive upstream failures. Once
+    `reset_timeout` has passed a single probe call is let through; its success
+    closes the circuit again, its failure keeps it open for another period.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        return "closed" if self._opened_at is None else "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._opened_at = time.monotonic()
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+
+class ResultCache:
+    """Small thread-safe LRU of last known good results, served in degraded mode."""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key, value) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="upstream")
+
+
+class Upstream:
+    """
+    Resilient wrapper around one upstream service. Use `call` for the
+    synchronous SDK clients (Azure AI Search) and `call_async` for coroutines
+    (Semantic Kernel agents / Azure OpenAI).
+
+    `fallback`, when given, is called with the final exception for upstream
+    failures (including an open circuit) and its return value is used as the
+    result. Client errors are always re-raised.
+
+    `operation` names the kind of request (e.g. a semantic hybrid query vs. a
+    top=0 facet query). Latency, and so the hedging delay, is tracked per
+    operation; the breaker is shared by the whole upstream.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        timeout: float,
+        retry: RetryPolicy = None,
+        breaker: CircuitBreaker = None,
+        hedge: bool = True,
+        hedge_delay: float = 1.0,
+        min_hedge_delay: float = 0.05,
+    ):
+        self.name = name
+        self.timeout = timeout
+        self.retry = retry or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker()
+        self.hedge = hedge
+        self.initial_hedge_delay = hedge_delay
+        self.min_hedge_delay = min_hedge_delay
+        self._latency = {}
+        self._latency_lock = threading.Lock()
+
+    def latency(self, operation: str = None) -> LatencyTracker:
+        """The latency history of `operation`, created on first use."""
+        with self._latency_lock:
+            if operation not in self._latency:
+                self._latency[operation] = LatencyTracker()
+            return self._latency[operation]
+
+    def hedge_delay(self, operation: str = None) -> float:
+        p95 = self.latency(operation).percentile(95)
+        if p95 is None:
+            p95 = self.initial_hedge_delay
+        return max(self.min_hedge_delay, p95)
+
+    def call(self, fn, *args, fallback=None, operation: str = None, **kwargs):
+        if not self.breaker.allow():
+            return self._degrade(CircuitOpenError(f"{self.name} circuit is open"), fallback)
+        try:
+            result = self._call_with_retries(fn, args, kwargs, operation)
+        except Exception as exc:
+            # The fallback runs outside this call's deadline, it gets whatever budget the caller has left.
+            return self._fail(exc, fallback)
+        self.breaker.record_success()
+        return result
+
+    async def call_async(self, fn, *args, fallback=None, operation: str = None, **kwargs):
+        if not self.breaker.allow():
+            return self._degrade(CircuitOpenError(f"{self.name} circuit is open"), fallback)
+        try:
+            result = await self._call_with_retries_async(fn, args, kwargs, operation)
+        except Exception as exc:
+            return self._fail(exc, fallback)
+        self.breaker.record_success()
+        return result
+
+    def _call_with_retries(self, fn, args, kwargs, operation: str):
+        with deadline_scope(self.timeout) as deadline:
+            attempt = 0
+            while True:
+                attempt += 1
+                try:
+                    return self._hedged(fn, args, kwargs, deadline, operation)
+                except Exception as exc:
+                    if not self.retry.should_retry(exc, attempt):
+                        raise
+                    delay = self.retry.delay(exc, attempt)
+                    if delay >= deadline.remaining():
+                        raise
+                time.sleep(delay)
+
+    async def _call_with_retries_async(self, fn, args, kwargs, operation: str):
+        with deadline_scope(self.timeout) as deadline:
+            attempt = 0
+            while True:
+                attempt += 1
+                try:
+                    return await self._hedged_async(fn, args, kwargs, deadline, operation)
+                except Exception as exc:
+                    if not self.retry.should_retry(exc, attempt):
+                        raise
+                    delay = self.retry.delay(exc, attempt)
+                    if delay >= deadline.remaining():
+                        raise
+                await asyncio.sleep(delay)
+
+    def _fail(self, exc: Exception, fallback):
+        if not is_upstream_failure(exc):
+            raise exc
+        self.breaker.record_failure()
+        return self._degrade(exc, fallback)
+
+    def _degrade(self, exc: Exception, fallback):
+        if fallback is None:
+            raise exc
+        return fallback(exc)
+
+    def _hedged(self, fn, args, kwargs, deadline: Deadline, operation: str):
+        start = time.monotonic()
+
+        def submit():
+            # Each attempt runs in its own copy of the context so the deadline is visible inside it.
+            return _executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+        pending = {submit()}
+        hedged = not self.hedge
+        error = None
+        while pending:
+            timeout = deadline.remaining()
+            if not hedged:
+                timeout = min(timeout, self.hedge_delay(operation))
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    self.latency(operation).record(time.monotonic() - start)
+                    return future.result()
+                error = future.exception()
+            if not done:
+                if deadline.expired():
+                    raise DeadlineExceeded(f"{self.name} did not answer before the deadline")
+                if not hedged:
+                    pending.add(submit())
+                    hedged = True
+        raise error
+
+    async def _hedged_async(self, fn, args, kwargs, deadline: Deadline, operation: str):
+        start = time.monotonic()
+        pending = {asyncio.ensure_future(fn(*args, **kwargs))}
+        hedged = not self.hedge
+        error = None
+        try:
+            while pending:
+                timeout = deadline.remaining()
+                if not hedged:
+                    timeout = min(timeout, self.hedge_delay(operation))
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        self.latency(operation).record(time.monotonic() - start)
+                        return task.result()
+                    error = task.exception()
+                if not done:
+                    if deadline.expired():
+                        raise DeadlineExceeded(f"{self.name} did not answer before the deadline")
+                    if not hedged:
+                        pending.add(asyncio.ensure_future(fn(*args, **kwargs)))
+                        hedged = True
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+
+class UpstreamStatusError(Exception):
+    """A throttled or 5xx HTTP response, raised so that Upstream retries it and its breaker counts it."""
+
+    def __init__(self, response):
+        super().__init__(f"HTTP {response.status_code}")
+        self.response = response
+        self.status_code = response.status_code
+
+
+class UpstreamTransport:
+    """
+    httpx async transport that sends every HTTP request through `upstream`,
+    on top of `transport`, the one that talks to the network. Used for the
+    shared Azure OpenAI client, so each chat completion is retried, timed out
+    and counted by the breaker on its own, also when it is made by an agent
+    that runs as another agent's tool.
+    """
+
+    def __init__(self, upstream: "Upstream", transport):
+        self.upstream = upstream
+        self.transport = transport
+
+    async def handle_async_request(self, request):
+        async def send():
+            response = await self.transport.handle_async_request(request)
+            if _is_upstream_failure_status(response.status_code):
+                await response.aread()
+                raise UpstreamStatusError(response)
+            return response
+
+        try:
+            return await self.upstream.call_async(send)
+        except UpstreamStatusError as exc:
+            # Out of retries: hand the response back so the SDK raises its usual typed error.
+            return exc.response
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+    async def __aenter__(self):
+        await self.transport.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.transport.__aexit__(*exc_info)
+
+
+# Shared upstreams: one breaker and one latency history per service, across all plugins and agents.
+search_upstream = Upstream(
+    "azure-search",
+    timeout=float(os.getenv("AZURE_SEARCH_TIMEOUT_SECONDS", "8")),
+)
+
+# Metadata scans read up to 100k documents: a longer budget, and never hedged, a second copy would double the work.
+scan_upstream = Upstream(
+    "azure-search-scan",
+    timeout=float(os.getenv("AZURE_SEARCH_SCAN_TIMEOUT_SECONDS", "45")),
+    hedge=False,
+)
+
+# Every Azure OpenAI request (see UpstreamTransport) is retried but never hedged.
+openai_upstream = Upstream(
+    "azure-openai",
+    timeout=float(os.getenv("AZURE_OPENAI_TIMEOUT_SECONDS", "60")),
+    hedge=False,
+)
+
+# A whole agent turn (completions, tool calls, searches) shares one deadline and falls back when
+# Azure OpenAI is down. It is never retried: its requests already are, one by one.
+agent_turn_upstream = Upstream(
+    "agent-turn",
+    timeout=openai_upstream.timeout,
+    retry=RetryPolicy(max_attempts=1),
+    hedge=False,
+)
+
+
+def search_documents(client, upstream: Upstream = None, operation: str = None, **search_kwargs) -> list:
+    """
+    Run `client.search(**search_kwargs)` through `upstream` (`search_upstream`
+    by default) as `operation` and return the materialised results. The
+    remaining deadline is passed down to the SDK as its read timeout so
+    abandoned attempts do not linger.
+    """
+    def run():
+        return list(client.search(read_timeout=remaining_time(), **search_kwargs))
+
+    return (upstream or search_upstream).call(run, operation=operation)
@@ -0,0 +1,150 @@
+from plugins import resilience
+from plugins.resilience import ResultCache, Upstream, is_upstream_failure, remaining_time, search_documents
+from plugins.search_engine import SearchEngine, get_profile
+
+"""
+Aggregations over the articles index that return numbers, not documents.
+
+Counts, top-k facet values and histograms are answered by Azure AI Search
+facet queries with top=0, so no document is transferred at all. Statistics
+that facets cannot compute (min/max/avg/sum, optionally per publication)
+scan only the requested metadata fields of the matching documents and are
+computed locally; content and vectors are never retrieved. Scans run through
+their own non-hedged upstream with a longer timeout and stop at
+MAX_SCAN_DOCS, in which case the result is marked as truncated.
+"""
+
+FACETABLE_FIELDS = ("publication", "claps", "responses", "reading_time")
+NUMERIC_FIELDS = ("claps", "responses", "reading_time")
+
+# Azure AI Search cannot page past 100,000 documents with skip.
+MAX_SCAN_DOCS = 100000
+
+# Last good answer per aggregate, served only when Azure AI Search is unavailable.
+_aggregates_cache = ResultCache()
+
+
+def _check_field(field: str, allowed: tuple) -> None:
+    if field not in allowed:
+        raise ValueError(f"Unsupported field '{field}'. Use one of: {', '.join(allowed)}")
+
+
+class SearchAggregator:
+    def __init__(self, profile: str = "both", client=None, upstream: Upstream = None, scan_upstream: Upstream = None):
+        self.engine = SearchEngine(get_profile(profile), client=client, upstream=upstream)
+        # None means the shared upstreams: search_upstream for facet queries, scan_upstream for stats scans.
+        self.upstream = upstream or resilience.search_upstream
+        self.scan_upstream = scan_upstream or resilience.scan_upstream
+
+    def count(self, filter: str = None) -> int:
+        """Number of documents matching `filter`."""
+        total, _ = self._facet_query([], filter)
+        return total
+
+    def top_values(self, field: str, filter: str = None, k: int = 10) -> list:
+        """The `k` most frequent values of `field` with their document counts."""
+        _check_field(field, FACETABLE_FIELDS)
+        _, facets = self._facet_query([f"{field},count:{k},sort:-count"], filter)
+        return [(bucket["value"], bucket["count"]) for bucket in facets.get(field, [])]
+
+    def histogram(self, field: str, interval: int, filter: str = None) -> list:
+        """
+        Document counts per bucket of a numeric `field`, as (bucket start,
+        count). The numeric fields are Int32, so `interval` must be a positive
+        whole number. `date` is not facetable in the index, so it cannot be
+        bucketed.
+        """
+        _check_field(field, NUMERIC_FIELDS)
+        try:
+            step = int(interval)
+        except (TypeError, ValueError):
+            step = 0
+        if step <= 0 or step != float(interval):
+            raise ValueError(f"interval must be a positive whole number, got {interval!r}")
+        _, facets = self._facet_query([f"{field},interval:{step}"], filter)
+        return [(bucket["value"], bucket["count"]) for bucket in facets.get(field, [])]
+
+    def stats(self, field: str, filter: str = None, group_by: str = None) -> dict:
+        """
+        count/min/max/avg/sum of a numeric `field` over the documents matching
+        `filter`, for all of them or per value of `group_by`. When more than
+        MAX_SCAN_DOCS documents match, only the first MAX_SCAN_DOCS are
+        scanned and every summary carries "truncated": True.
+        """
+        _check_field(field, NUMERIC_FIELDS)
+        if group_by is not None:
+            _check_field(group_by, FACETABLE_FIELDS)
+        key = ("stats", self.engine.profile.name, field, filter, group_by)
+        select = [field] if group_by is None else [field, group_by]
+        try:
+            docs = search_documents(
+                self.engine.client,
+                upstream=self.scan_upstream,
+                operation="scan",
+                search_text="*",
+                filter=filter,
+                select=select,
+                top=MAX_SCAN_DOCS + 1,  # one extra document tells a capped scan from an exact fit
+            )
+        except Exception as exc:
+            # Degraded mode: serve the last good answer for the same question.
+            cached = _aggregates_cache.get(key)
+            if cached is None or not is_upstream_failure(exc):
+                raise
+            return cached
+
+        truncated = len(docs) > MAX_SCAN_DOCS
+        groups = {}
+        for doc in docs[:MAX_SCAN_DOCS]:
+            value = doc.get(field)
+            if value is None:
+                continue
+            groups.setdefault(doc.get(group_by) if group_by else None, []).append(value)
+
+        summaries = {group: _summarize(values, truncated) for group, values in groups.items()}
+        result = summaries.get(None, _summarize([], truncated)) if group_by is None else summaries
+        _aggregates_cache.put(key, result)
+        return result
+
+    def _facet_query(self, facets: list, filter: str = None):
+        key = ("facets", self.engine.profile.name, tuple(facets), filter)
+        client = self.engine.client
+
+        def run():
+            results = client.search(
+                search_text="*",
+                filter=filter,
+                facets=facets or None,
+                top=0,
+                include_total_count=True,
+                read_timeout=remaining_time(),
+            )
+            return results.get_count(), results.get_facets() or {}
+
+        try:
+            result = self.upstream.call(run, operation="facets")
+        except Exception as exc:
+            # Degraded mode: serve the last good answer for the same question.
+            cached = _aggregates_cache.get(key)
+            if cached is None or not is_upstream_failure(exc):
+                raise
+            return cached
+        _aggregates_cache.put(key, result)
+        return result
+
+
+def _summarize(values: list, truncated: bool = False) -> dict:
+    if not values:
+        summary = {"count": 0, "min": None, "max": None, "avg": None, "sum": 0}
+    else:
+        total = sum(values)
+        summary = {
+            "count": len(values),
+            "min": min(values),
+            "max": max(values),
+            "avg": round(total / len(values), 2),
+            "sum": total,
+        }
+    if truncated:
+        summary["truncated"] = True
+    return summary
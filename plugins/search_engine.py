@@ -0,0 +1,271 @@
+import json
+import os
+from dataclasses import dataclass, fields, replace
+from plugins.resilience import ResultCache, Upstream, is_upstream_failure, search_documents
+
+"""
+One retrieval engine for every AI Search plugin.
+
+Each plugin is a thin adapter that picks a SearchProfile by name. A profile
+declares everything that used to be hard-coded per plugin: which env vars
+point at the index, vector fields and their k, candidate pool, top, select
+list, semantic reranker on/off and the filter strategy. Profiles can be
+overridden or added without code changes through a JSON file named by
+AZURE_SEARCH_PROFILES_FILE, e.g.
+
+    {"both": {"candidate_pool": 30}, "both_no_rerank": {"base": "both", "reranker": false}}
+
+The Azure SDK is imported on first use, not at import time, to keep cold
+start low. Environment variables are loaded by the entry point (app or script).
+"""
+
+# Filter strategies
+FILTER_NONE = "none"                                   # hybrid search only, filters are ignored
+FILTER_PRE = "prefilter"                               # filter applied to the hybrid query itself
+FILTER_TWO_PASS = "two_pass"                           # hybrid candidate pool, then filter those ids
+FILTER_TWO_PASS_IF_FILTERED = "two_pass_if_filtered"   # single hybrid pass when there is no filter
+FILTER_STRATEGIES = (FILTER_NONE, FILTER_PRE, FILTER_TWO_PASS, FILTER_TWO_PASS_IF_FILTERED)
+
+ARTICLE_FIELDS = ("id", "title", "subtitle", "content", "reading_time", "responses", "claps", "date", "publication")
+
+
+@dataclass(frozen=True)
+class VectorField:
+    name: str
+    k: int
+
+
+@dataclass(frozen=True)
+class SearchProfile:
+    name: str
+    # Index schema
+    endpoint_env: str = "AZURE_SEARCH_SERVICE_ENDPOINT"
+    key_env: str = "AZURE_SEARCH_ADMIN_KEY"
+    index_env: str = "AZURE_SEARCH_INDEX"
+    key_field: str = "id"
+    vector_fields: tuple = (VectorField("titlesVector", 30), VectorField("contentVector", 30))
+    search_fields: tuple = ("content", "title", "subtitle")
+    # Retrieval
+    semantic_config: str = "my-semantic-config"
+    reranker: bool = True
+    candidate_pool: int = 50
+    top: int = 5
+    # Fields returned per document; None means text_fields. Vector fields are only returned when listed here.
+    select: tuple = ARTICLE_FIELDS
+    filter_strategy: str = FILTER_TWO_PASS
+    # Fields joined into one line per document when a plugin returns text
+    text_fields: tuple = ("title", "subtitle", "content")
+
+    def __post_init__(self):
+        if self.filter_strategy not in FILTER_STRATEGIES:
+            raise ValueError(f"Unknown filter_strategy '{self.filter_strategy}' in search profile '{self.name}'")
+
+    @classmethod
+    def from_dict(cls, name: str, values: dict, base: "SearchProfile" = None) -> "SearchProfile":
+        """Build a profile from JSON-style values, starting from `base` when given."""
+        values = dict(values)
+        values.pop("base", None)
+        unknown = set(values) - {f.name for f in fields(cls)}
+        if unknown:
+            raise ValueError(f"Unknown settings {sorted(unknown)} in search profile '{name}'")
+        if "vector_fields" in values:
+            values["vector_fields"] = tuple(
+                VectorField(**v) if isinstance(v, dict) else VectorField(*v) for v in values["vector_fields"]
+            )
+        for key in ("search_fields", "select", "text_fields"):
+            if values.get(key) is not None:
+                values[key] = tuple(values[key])
+        values["name"] = name
+        return replace(base, **values) if base else cls(**values)
+
+
+PROFILES = {
+    # Two-pass hybrid → structured filter over the articles index (ai_search_both).
+    "both": SearchProfile(name="both"),
+    # Hybrid + semantic only, no filters (ai_search_hybrid).
+    "hybrid": SearchProfile(
+        name="hybrid",
+        vector_fields=(VectorField("titlesVector", 30), VectorField("contentVector", 50)),
+        filter_strategy=FILTER_NONE,
+        select=("id", "title", "subtitle", "content"),
+    ),
+    # Single pass with the filter on the hybrid query, over a chunked index (ai_search_filtered_only).
+    "filtered_only": SearchProfile(
+        name="filtered_only",
+        endpoint_env="AZURE_SEARCH_ENDPOINT",
+        key_env="AZURE_SEARCH_API_KEY",
+        vector_fields=(VectorField("vector", 50),),
+        search_fields=("chunk",),
+        top=3,
+        select=("chunk",),
+        filter_strategy=FILTER_PRE,
+        text_fields=("chunk",),
+    ),
+    # Like "both", but a plain hybrid top 5 when there is no filter (ai_search_hybrid_filtered_vs2).
+    "hybrid_filtered_vs2": SearchProfile(
+        name="hybrid_filtered_vs2",
+        filter_strategy=FILTER_TWO_PASS_IF_FILTERED,
+    ),
+}
+
+
+def load_profiles(path: str) -> dict:
+    """Read profiles from a JSON file of {name: settings}; "base" names the profile to start from."""
+    with open(path, encoding="utf-8") as f:
+        raw = json.load(f)
+    profiles = dict(PROFILES)
+    for name, values in raw.items():
+        base_name = values.get("base")
+        if base_name is not None and base_name not in profiles:
+            raise ValueError(f"Unknown base profile '{base_name}' for search profile '{name}'. Known profiles: {sorted(profiles)}")
+        base = profiles.get(base_name or name)
+        profiles[name] = SearchProfile.from_dict(name, values, base=base)
+    return profiles
+
+
+if os.getenv("AZURE_SEARCH_PROFILES_FILE"):
+    PROFILES = load_profiles(os.getenv("AZURE_SEARCH_PROFILES_FILE"))
+
+
+def get_profile(name: str) -> SearchProfile:
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Unknown search profile '{name}'. Known profiles: {sorted(PROFILES)}") from None
+
+
+# Last good answer per (profile, query, filter, top), served when Azure AI Search is unavailable.
+_results_cache = ResultCache()
+
+UNFILTERED_WARNING = (
+    "WARNING: the structured filter could not be applied because Azure AI Search is degraded. "
+    "These are unfiltered hybrid search results and may not match the requested constraints ({filter})."
+)
+
+
+class SearchResults(list):
+    """
+    Documents returned by SearchEngine.search. `warning` is set when they
+    come from a degraded mode the caller must know about; it is also the
+    first line of str(), which is what Semantic Kernel hands to the LLM.
+    """
+
+    def __init__(self, docs=(), warning: str = None):
+        super().__init__(docs)
+        self.warning = warning
+
+    def __str__(self) -> str:
+        documents = super().__str__()
+        return f"{self.warning}\n{documents}" if self.warning else documents
+
+
+class SearchEngine:
+    def __init__(self, profile: SearchProfile, client=None, upstream: Upstream = None):
+        self.profile = profile
+        self._client = client
+        self.upstream = upstream  # None means the shared search_upstream
+
+    @property
+    def client(self):
+        """The azure.search.documents SearchClient for the profile's index, created on first use."""
+        if self._client is None:
+            from azure.core.credentials import AzureKeyCredential
+            from azure.search.documents import SearchClient
+
+            self._client = SearchClient(
+                endpoint=os.getenv(self.profile.endpoint_env),
+                index_name=os.getenv(self.profile.index_env),
+                credential=AzureKeyCredential(os.getenv(self.profile.key_env)),
+                retry_total=0,  # retries are owned by plugins/resilience.py
+            )
+        return self._client
+
+    def search(self, query: str, filter: str = None, top: int = None) -> SearchResults:
+        """Run the profile's retrieval strategy and return the matching documents."""
+        profile = self.profile
+        top = top or profile.top
+        if profile.filter_strategy == FILTER_NONE:
+            filter = None
+        cache_key = (profile.name, query, filter, top)
+
+        two_pass = profile.filter_strategy == FILTER_TWO_PASS or (
+            profile.filter_strategy == FILTER_TWO_PASS_IF_FILTERED and filter
+        )
+        try:
+            if two_pass:
+                candidates = self._hybrid(query, top=profile.candidate_pool)
+            else:
+                candidates = self._hybrid(query, top=top, filter=filter)
+        except Exception as exc:
+            # Degraded mode: serve the last good answer for this exact request, if we have one.
+            cached = _results_cache.get(cache_key)
+            if cached is None or not is_upstream_failure(exc):
+                raise
+            return SearchResults(cached)
+        if not two_pass:
+            _results_cache.put(cache_key, candidates)
+            return SearchResults(candidates)
+
+        ids = [str(doc[profile.key_field]) for doc in candidates if profile.key_field in doc]
+        if not ids:
+            return SearchResults()
+        id_filter = " or ".join(f"{profile.key_field} eq '{id}'" for id in ids)
+        combined_filter = f"({id_filter}) and ({filter})" if filter else id_filter
+        try:
+            docs = search_documents(
+                self.client,
+                upstream=self.upstream,
+                operation=f"{profile.name}:id_filter",
+                search_text="*",
+                filter=combined_filter,
+                select=self._select(),
+                top=top,
+            )
+        except Exception as exc:
+            # Degraded mode: fall back to the hybrid-only candidates, and say they are unfiltered.
+            if not is_upstream_failure(exc):
+                raise
+            warning = UNFILTERED_WARNING.format(filter=filter) if filter else None
+            return SearchResults(candidates[:top], warning=warning)
+        _results_cache.put(cache_key, docs)
+        return SearchResults(docs)
+
+    def search_text(self, query: str, filter: str = None, top: int = None) -> str:
+        """Like search(), but one line per document built from the profile's text_fields."""
+        docs = self.search(query, filter=filter, top=top)
+        lines = [" | ".join(str(doc.get(name, "")) for name in self.profile.text_fields) for doc in docs]
+        text = "\n".join(lines) if lines else "No documents found."
+        return f"{docs.warning}\n{text}" if docs.warning else text
+
+    def _select(self) -> list:
+        """
+        The fields to retrieve, never everything: the index's vector fields
+        are retrievable and would add thousands of floats to every document.
+        """
+        profile = self.profile
+        select = profile.select or profile.text_fields
+        if profile.filter_strategy in (FILTER_TWO_PASS, FILTER_TWO_PASS_IF_FILTERED):
+            # The second pass filters the candidates on their key.
+            select = (profile.key_field, *select)
+        return list(dict.fromkeys(select))
+
+    def _hybrid(self, query: str, top: int, filter: str = None) -> list:
+        from azure.search.documents.models import VectorizableTextQuery
+
+        profile = self.profile
+        kwargs = {
+            "search_text": query,
+            "vector_queries": [
+                VectorizableTextQuery(text=query, k_nearest_neighbors=v.k, fields=v.name)
+                for v in profile.vector_fields
+            ],
+            "search_fields": list(profile.search_fields),
+            "select": self._select(),
+            "top": top,
+        }
+        if profile.reranker:
+            kwargs["query_type"] = "semantic"
+            kwargs["semantic_configuration_name"] = profile.semantic_config
+        if filter:
+            kwargs["filter"] = filter
+        return search_documents(self.client, upstream=self.upstream, operation=f"{profile.name}:hybrid", **kwargs)
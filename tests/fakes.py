@@ -0,0 +1,41 @@
+"""
+Local stand-ins for azure.search.documents.SearchClient, shared by the plugin
+tests. No Azure resources are needed.
+"""
+
+
+class FakeResults:
+    def __init__(self, docs, count, facets):
+        self.docs = docs
+        self.count = count
+        self.facets = facets
+
+    def __iter__(self):
+        return iter(self.docs)
+
+    def get_count(self):
+        return self.count
+
+    def get_facets(self):
+        return self.facets
+
+
+class FakeSearchClient:
+    """Records every request and answers with the first `top` docs, reduced to `select`."""
+
+    def __init__(self, docs, facets=None):
+        self.docs = docs
+        self.facets = facets or {}
+        self.requests = []
+
+    def search(self, **kwargs):
+        kwargs.pop("read_timeout", None)
+        self.requests.append(kwargs)
+        docs = [{k: doc[k] for k in kwargs["select"] if k in doc} for doc in self.docs] if kwargs.get("select") else self.docs
+        return FakeResults(docs[: kwargs.get("top", 50)], len(self.docs), self.facets)
+
+
+class UnavailableError(Exception):
+    """Shaped like an Azure SDK HttpResponseError for a 503."""
+
+    status_code = 503
@@ -1,8 +1,14 @@
 import sys
 import os
 
-# Add plugins directory to Python path
+# Add plugins directory (and the repo root, for plugins.resilience) to Python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../plugins')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from dotenv import load_dotenv
+
+# Load environment variables (keys, endpoint, etc.)
+load_dotenv()
 
 from ai_search_hybrid import AiSearchHybrid
 
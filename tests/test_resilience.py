@@ -0,0 +1,380 @@
+import asyncio
+import json
+import sys
+import os
+import threading
+import time
+
+import httpx
+import openai
+from semantic_kernel.exceptions import ServiceResponseException
+
+# Add the repo root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from plugins.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    DeadlineExceeded,
+    RetryPolicy,
+    Upstream,
+    deadline_scope,
+    remaining_time,
+)
+
+"""
+Fault-injecting local stand-ins for Azure AI Search / Azure OpenAI.
+No Azure resources are needed: each FaultyUpstream plays back a script of
+outcomes (answer, slow answer, HTTP error with optional Retry-After).
+"""
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class FakeHttpError(Exception):
+    """Shaped like azure.core.exceptions.HttpResponseError / openai.APIStatusError."""
+
+    def __init__(self, status_code, retry_after=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        headers = {"Retry-After": str(retry_after)} if retry_after is not None else {}
+        self.response = FakeResponse(status_code, headers)
+
+
+class FaultyUpstream:
+    """
+    Plays back `script` one step per call: ("ok", value), ("slow", seconds, value)
+    or ("error", status_code, retry_after). The last step repeats forever.
+    """
+
+    def __init__(self, *script):
+        self.script = list(script)
+        self.calls = 0
+        self.call_times = []
+        self._lock = threading.Lock()
+
+    def _next_step(self):
+        with self._lock:
+            step = self.script[min(self.calls, len(self.script) - 1)]
+            self.calls += 1
+            self.call_times.append(time.monotonic())
+        return step
+
+    def __call__(self):
+        step = self._next_step()
+        if step[0] == "slow":
+            time.sleep(step[1])
+            return step[2]
+        if step[0] == "error":
+            raise FakeHttpError(step[1], step[2])
+        return step[1]
+
+    async def call_async(self):
+        step = self._next_step()
+        if step[0] == "slow":
+            await asyncio.sleep(step[1])
+            return step[2]
+        if step[0] == "error":
+            raise FakeHttpError(step[1], step[2])
+        return step[1]
+
+
+def make_upstream(**kwargs):
+    kwargs.setdefault("timeout", 2.0)
+    kwargs.setdefault("retry", RetryPolicy(max_attempts=3, base_delay=0.01, max_delay=0.02))
+    return Upstream("stand-in", **kwargs)
+
+
+def test_retry_honors_retry_after():
+    fake = FaultyUpstream(("error", 429, 0.2), ("ok", "docs"))
+    upstream = make_upstream(hedge=False)
+
+    assert upstream.call(fake) == "docs"
+    assert fake.calls == 2
+    assert fake.call_times[1] - fake.call_times[0] >= 0.2
+
+
+def test_client_error_is_not_retried_and_does_not_trip_breaker():
+    fake = FaultyUpstream(("error", 400, None))
+    upstream = make_upstream(hedge=False, breaker=CircuitBreaker(failure_threshold=1))
+
+    try:
+        upstream.call(fake, fallback=lambda exc: "fallback")
+    except FakeHttpError as exc:
+        assert exc.status_code == 400
+    else:
+        raise AssertionError("a 400 must reach the caller, not the fallback")
+    assert fake.calls == 1
+    assert upstream.breaker.state == "closed"
+
+
+def test_hedged_request_beats_slow_replica():
+    fake = FaultyUpstream(("slow", 1.5, "slow replica"), ("ok", "fast replica"))
+    upstream = make_upstream(hedge_delay=0.05)
+
+    start = time.monotonic()
+    assert upstream.call(fake) == "fast replica"
+    assert time.monotonic() - start < 1.0
+    assert fake.calls == 2
+
+
+def test_hedge_delay_follows_p95_per_operation():
+    upstream = make_upstream(hedge_delay=1.0)
+    slow, fast = upstream.latency("hybrid"), upstream.latency("id_filter")
+    for i in range(slow.min_samples - 1):
+        slow.record(0.5 + i * 0.01)
+        fast.record(0.05)
+
+    assert upstream.hedge_delay("hybrid") == 1.0  # not enough samples yet
+    slow.record(0.69)
+    fast.record(0.05)
+
+    assert upstream.hedge_delay("hybrid") == slow.percentile(95)
+    assert abs(slow.percentile(95) - 0.68) < 1e-9
+    assert upstream.hedge_delay("id_filter") == 0.05
+    assert upstream.hedge_delay() == 1.0
+
+
+def test_calls_record_latency_under_their_operation():
+    fake = FaultyUpstream(("ok", "facets"))
+    upstream = make_upstream()
+
+    upstream.call(fake, operation="facets")
+
+    assert len(upstream.latency("facets")) == 1
+    assert len(upstream.latency()) == 0
+
+
+def test_deadline_propagates_and_is_enforced():
+    fake = FaultyUpstream(("slow", 1.0, "too late"))
+    upstream = make_upstream(hedge=False, timeout=5.0)
+
+    start = time.monotonic()
+    with deadline_scope(0.1):
+        try:
+            upstream.call(fake)
+        except DeadlineExceeded:
+            pass
+        else:
+            raise AssertionError("the caller's deadline must cap the upstream timeout")
+    assert time.monotonic() - start < 0.5
+
+
+def test_nested_deadline_never_extends_parent():
+    with deadline_scope(0.5):
+        with deadline_scope(60):
+            assert remaining_time() <= 0.5
+    assert remaining_time() is None
+
+
+def test_breaker_opens_and_serves_fallback():
+    fake = FaultyUpstream(("error", 503, None))
+    upstream = make_upstream(
+        hedge=False,
+        retry=RetryPolicy(max_attempts=1),
+        breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60),
+    )
+
+    for _ in range(2):
+        assert upstream.call(fake, fallback=lambda exc: "cached") == "cached"
+    assert upstream.breaker.state == "open"
+
+    errors = []
+    assert upstream.call(fake, fallback=lambda exc: errors.append(exc) or "cached") == "cached"
+    assert fake.calls == 2
+    assert isinstance(errors[0], CircuitOpenError)
+
+
+def test_breaker_probe_closes_circuit():
+    fake = FaultyUpstream(("error", 503, None), ("ok", "recovered"))
+    upstream = make_upstream(
+        hedge=False,
+        retry=RetryPolicy(max_attempts=1),
+        breaker=CircuitBreaker(failure_threshold=1, reset_timeout=0.05),
+    )
+
+    assert upstream.call(fake, fallback=lambda exc: None) is None
+    assert upstream.breaker.state == "open"
+    time.sleep(0.06)
+    assert upstream.call(fake) == "recovered"
+    assert upstream.breaker.state == "closed"
+
+
+def openai_error(error_type, status_code, headers=None):
+    """A real OpenAI SDK error, wrapped the way Semantic Kernel's OpenAIHandler re-raises it."""
+    request = httpx.Request("POST", "https://example.openai.azure.com/openai/deployments/gpt-4.1/chat/completions")
+    if error_type is openai.APIConnectionError:
+        error = error_type(request=request)
+    else:
+        response = httpx.Response(status_code, headers=headers or {}, request=request)
+        error = error_type(f"HTTP {status_code}", response=response, body=None)
+    try:
+        raise error
+    except Exception as ex:
+        try:
+            raise ServiceResponseException("service failed to complete the prompt", ex) from ex
+        except ServiceResponseException as wrapped:
+            return wrapped
+
+
+class WrappedFaults:
+    """Async stand-in for an agent turn that raises the given errors, then answers."""
+
+    def __init__(self, *errors, answer="answer"):
+        self.errors = list(errors)
+        self.answer = answer
+        self.calls = 0
+        self.call_times = []
+
+    async def __call__(self):
+        self.calls += 1
+        self.call_times.append(time.monotonic())
+        if self.errors:
+            raise self.errors.pop(0)
+        return self.answer
+
+
+def test_wrapped_openai_throttling_is_retried_with_retry_after():
+    turn = WrappedFaults(openai_error(openai.RateLimitError, 429, {"retry-after-ms": "200"}))
+    upstream = make_upstream(hedge=False)
+
+    assert asyncio.run(upstream.call_async(turn)) == "answer"
+    assert turn.calls == 2
+    assert turn.call_times[1] - turn.call_times[0] >= 0.2
+
+
+def test_wrapped_openai_client_error_is_not_masked():
+    turn = WrappedFaults(openai_error(openai.BadRequestError, 400))
+    upstream = make_upstream(hedge=False, breaker=CircuitBreaker(failure_threshold=1))
+
+    try:
+        asyncio.run(upstream.call_async(turn, fallback=lambda exc: "fallback"))
+    except ServiceResponseException as exc:
+        assert isinstance(exc.__cause__, openai.BadRequestError)
+    else:
+        raise AssertionError("a wrapped 400 must reach the caller, not the fallback")
+    assert turn.calls == 1
+    assert upstream.breaker.state == "closed"
+
+
+def test_wrapped_connection_error_is_an_upstream_failure():
+    turn = WrappedFaults(openai_error(openai.APIConnectionError, None))
+    upstream = make_upstream(hedge=False, breaker=CircuitBreaker(failure_threshold=1))
+
+    assert asyncio.run(upstream.call_async(turn, fallback=lambda exc: "fallback")) == "fallback"
+    assert upstream.breaker.state == "open"
+
+
+def test_programming_errors_propagate_unchanged():
+    def broken():
+        return {}["missing"]
+
+    upstream = make_upstream(hedge=False, breaker=CircuitBreaker(failure_threshold=1))
+
+    try:
+        upstream.call(broken, fallback=lambda exc: "fallback")
+    except KeyError:
+        pass
+    else:
+        raise AssertionError("a KeyError must reach the caller, not the fallback")
+    assert upstream.breaker.state == "closed"
+
+
+def test_async_retry_and_hedge():
+    retried = FaultyUpstream(("error", 503, None), ("ok", "answer"))
+    hedged = FaultyUpstream(("slow", 1.5, "slow"), ("ok", "fast"))
+
+    async def run():
+        assert await make_upstream(hedge=False).call_async(retried.call_async) == "answer"
+        assert await make_upstream(hedge_delay=0.05).call_async(hedged.call_async) == "fast"
+
+    asyncio.run(run())
+    assert retried.calls == 2
+    assert hedged.calls == 2
+
+
+
+def chat_completion(content=None, tool_call=None):
+    message = {"role": "assistant", "content": content}
+    if tool_call is not None:
+        message["tool_calls"] = [{"id": "call_1", "type": "function", "function": tool_call}]
+    return {
+        "id": "chatcmpl-1",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "gpt-4.1",
+        "choices": [{"index": 0, "message": message, "finish_reason": "tool_calls" if tool_call else "stop"}],
+    }
+
+
+def run_nested_agents(monkeypatch, replies, upstream, fallback=None):
+    """
+    One turn of a router agent that calls a sub-agent as a tool, on the shared
+    client setup, against scripted (status, body) replies. Returns the answer
+    and the JSON bodies of the chat completion requests that were sent.
+    """
+    from semantic_kernel.agents import ChatCompletionAgent
+    from semantic_kernel.connectors.ai.open_ai import AzureChatCompletion
+    from agents import make_openai_client, openai_http_library
+
+    for key, value in (("AZURE_OPENAI_ENDPOINT", "https://example.openai.azure.com"), ("AZURE_OPENAI_API_KEY", "key"), ("AZURE_OPENAI_API_VERSION", "2024-10-21")):
+        monkeypatch.setenv(key, value)
+    http = openai_http_library()
+    requests = []
+
+    def handler(request):
+        requests.append(json.loads(request.content))
+        status, body = replies[min(len(requests), len(replies)) - 1]
+        return http.Response(status, json=body, headers={"retry-after-ms": "50"} if status == 429 else {})
+
+    service = AzureChatCompletion(deployment_name="gpt-4.1", async_client=make_openai_client(http.MockTransport(handler), upstream))
+    sub_agent = ChatCompletionAgent(service=service, name="SubAgent", instructions="Answer.")
+    router = ChatCompletionAgent(service=service, name="Router", instructions="Route.", plugins=[sub_agent])
+    turn = make_upstream(hedge=False, retry=RetryPolicy(max_attempts=1))
+
+    response = asyncio.run(turn.call_async(router.get_response, messages="find sleep articles", fallback=fallback))
+    return str(response), requests
+
+
+ROUTER_CALLS_SUB_AGENT = (200, chat_completion(tool_call={"name": "SubAgent-SubAgent", "arguments": '{"messages": "sleep articles"}'}))
+
+
+def test_nested_agent_completion_is_retried_on_its_own(monkeypatch):
+    # The sub-agent's completion is throttled once (wrapped by Semantic Kernel inside the tool call).
+    replies = [
+        ROUTER_CALLS_SUB_AGENT,
+        (429, {"error": {"code": "429", "message": "throttled"}}),
+        (200, chat_completion("sub-agent answer")),
+        (200, chat_completion("router answer")),
+    ]
+    upstream = make_upstream(hedge=False)
+
+    answer, requests = run_nested_agents(monkeypatch, replies, upstream)
+
+    assert answer == "router answer"
+    assert len(requests) == 4  # only the throttled sub-agent completion was sent twice, the turn was not re-run
+    assert requests[1] == requests[2]
+    assert "sub-agent answer" in json.dumps(requests[3])
+
+
+def test_nested_agent_failure_reaches_the_breaker(monkeypatch):
+    replies = [
+        ROUTER_CALLS_SUB_AGENT,
+        (503, {"error": {"code": "503", "message": "unavailable"}}),
+        (503, {"error": {"code": "503", "message": "unavailable"}}),
+        (503, {"error": {"code": "503", "message": "unavailable"}}),
+        (200, chat_completion("router answer")),
+    ]
+    upstream = make_upstream(hedge=False, breaker=CircuitBreaker(failure_threshold=1))
+
+    answer, requests = run_nested_agents(monkeypatch, replies, upstream, fallback=lambda exc: "degraded answer")
+
+    # Semantic Kernel hands the tool error to the router as text, but the breaker saw it:
+    # the router's next completion fails fast and the turn degrades.
+    assert upstream.breaker.state == "open"
+    assert len(requests) == 4
+    assert answer == "degraded answer"
@@ -0,0 +1,130 @@
+import sys
+import os
+
+# Add the repo root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fakes import FakeSearchClient, UnavailableError
+from plugins import search_aggregations
+from plugins.resilience import CircuitBreaker, RetryPolicy, Upstream
+from plugins.search_aggregations import SearchAggregator
+
+"""
+Checks the facet and scan queries the aggregation plugin sends to a fake SearchClient.
+"""
+
+ARTICLES = [
+    {"id": "1", "publication": "Better Humans", "claps": 1200, "reading_time": 8},
+    {"id": "2", "publication": "Better Humans", "claps": 300, "reading_time": 4},
+    {"id": "3", "publication": "UX Collective", "claps": 50, "reading_time": 3},
+    {"id": "4", "publication": "UX Collective", "claps": 2500, "reading_time": None},
+]
+
+
+def test_count_uses_top_zero():
+    client = FakeSearchClient(ARTICLES)
+    aggregator = SearchAggregator(client=client)
+
+    assert aggregator.count("publication eq 'Better Humans' and claps gt 1000") == 4
+
+    (request,) = client.requests
+    assert request["top"] == 0
+    assert request["include_total_count"] is True
+    assert request["filter"] == "publication eq 'Better Humans' and claps gt 1000"
+
+
+def test_top_values_and_histogram_are_facet_queries():
+    facets = {
+        "publication": [{"value": "Better Humans", "count": 2}, {"value": "UX Collective", "count": 2}],
+        "claps": [{"value": 0, "count": 2}, {"value": 1000, "count": 2}],
+    }
+    client = FakeSearchClient(ARTICLES, facets=facets)
+    aggregator = SearchAggregator(client=client)
+
+    assert aggregator.top_values("publication", k=5, filter="claps gt 0") == [("Better Humans", 2), ("UX Collective", 2)]
+    assert aggregator.histogram("claps", "1000", filter="claps gt 0") == [(0, 2), (1000, 2)]
+
+    top_request, histogram_request = client.requests
+    assert top_request["facets"] == ["publication,count:5,sort:-count"]
+    assert histogram_request["facets"] == ["claps,interval:1000"]
+    assert top_request["top"] == histogram_request["top"] == 0
+
+
+def test_stats_scan_only_selected_fields():
+    client = FakeSearchClient(ARTICLES)
+    aggregator = SearchAggregator(client=client)
+
+    overall = aggregator.stats("reading_time", filter="claps ge 0")
+    per_publication = aggregator.stats("claps", filter="claps ge 0", group_by="publication")
+
+    assert overall == {"count": 3, "min": 3, "max": 8, "avg": 5.0, "sum": 15}
+    assert per_publication["Better Humans"] == {"count": 2, "min": 300, "max": 1200, "avg": 750.0, "sum": 1500}
+    assert per_publication["UX Collective"]["avg"] == 1275.0
+    assert client.requests[0]["select"] == ["reading_time"]
+    assert client.requests[1]["select"] == ["claps", "publication"]
+
+
+def test_stats_scan_is_capped_and_not_hedged(monkeypatch):
+    monkeypatch.setattr(search_aggregations, "MAX_SCAN_DOCS", 3)
+    client = FakeSearchClient(ARTICLES)
+    aggregator = SearchAggregator(client=client)
+
+    stats = aggregator.stats("claps")
+
+    assert stats == {"count": 3, "min": 50, "max": 1200, "avg": 516.67, "sum": 1550, "truncated": True}
+    assert client.requests[0]["top"] == 4
+    assert aggregator.scan_upstream.hedge is False
+    assert aggregator.scan_upstream.timeout > aggregator.upstream.timeout
+
+
+class FlakyClient(FakeSearchClient):
+    """Answers once, then fails every request with a 503."""
+
+    def search(self, **kwargs):
+        if self.requests:
+            raise UnavailableError("HTTP 503")
+        return super().search(**kwargs)
+
+
+def test_aggregates_are_fresh_and_cache_is_only_a_fallback():
+    stand_in = Upstream(
+        "stand-in", timeout=2.0, retry=RetryPolicy(max_attempts=1), breaker=CircuitBreaker(failure_threshold=100), hedge=False
+    )
+    client = FakeSearchClient(ARTICLES)
+    aggregator = SearchAggregator(client=client, upstream=stand_in)
+
+    assert aggregator.count("responses gt 12345") == 4
+    client.docs = ARTICLES[:2]
+    assert aggregator.count("responses gt 12345") == 2
+    assert len(client.requests) == 2
+
+    flaky = FlakyClient(ARTICLES[:3])
+    degraded = SearchAggregator(client=flaky, upstream=stand_in)
+    assert degraded.count("responses gt 54321") == 3
+    assert degraded.count("responses gt 54321") == 3
+    try:
+        degraded.count("responses gt 99999")
+    except UnavailableError:
+        pass
+    else:
+        raise AssertionError("without a cached answer the failure must reach the caller")
+
+
+def test_unsupported_fields_are_rejected():
+    aggregator = SearchAggregator(client=FakeSearchClient(ARTICLES))
+    for call in (
+        lambda: aggregator.top_values("content"),
+        lambda: aggregator.stats("publication"),
+        lambda: aggregator.histogram("date", "year"),
+        lambda: aggregator.histogram("claps", 0),
+        lambda: aggregator.histogram("claps", "inf"),
+        lambda: aggregator.histogram("claps", "1e3"),
+        lambda: aggregator.histogram("claps", 500.5),
+    ):
+        try:
+            call()
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("expected a ValueError")
+
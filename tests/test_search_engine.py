@@ -0,0 +1,159 @@
+import json
+import sys
+import os
+import tempfile
+
+# Add the repo root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fakes import FakeSearchClient, UnavailableError
+from plugins.resilience import RetryPolicy, Upstream
+from plugins.search_engine import (
+    FILTER_PRE,
+    SearchEngine,
+    SearchProfile,
+    VectorField,
+    get_profile,
+    load_profiles,
+)
+
+"""
+Checks the requests each search profile sends to a fake SearchClient.
+"""
+
+DOCS = [
+    {"id": str(i), "title": f"title {i}", "subtitle": f"subtitle {i}", "content": f"content {i}", "chunk": f"chunk {i}"}
+    for i in range(1, 8)
+]
+
+
+class FilterPassDownClient(FakeSearchClient):
+    """Answers the hybrid pass, then fails every filtered pass with a 503."""
+
+    def search(self, **kwargs):
+        if kwargs.get("search_text") == "*":
+            raise UnavailableError("HTTP 503")
+        return super().search(**kwargs)
+
+
+def test_two_pass_filters_candidate_ids():
+    client = FakeSearchClient(DOCS)
+    engine = SearchEngine(get_profile("both"), client=client)
+
+    docs = engine.search("productivity", filter="claps ge 1000")
+
+    assert len(docs) == 5
+    hybrid, filtered = client.requests
+    assert hybrid["top"] == 50
+    assert hybrid["query_type"] == "semantic"
+    assert [(v.fields, v.k_nearest_neighbors) for v in hybrid["vector_queries"]] == [("titlesVector", 30), ("contentVector", 30)]
+    assert "filter" not in hybrid
+    assert filtered["search_text"] == "*"
+    assert filtered["filter"].startswith("(id eq '1' or id eq '2'")
+    assert filtered["filter"].endswith(") and (claps ge 1000)")
+    assert filtered["top"] == 5
+
+
+def test_two_pass_if_filtered_is_single_pass_without_filter():
+    client = FakeSearchClient(DOCS)
+    engine = SearchEngine(get_profile("hybrid_filtered_vs2"), client=client)
+
+    engine.search("productivity")
+
+    assert len(client.requests) == 1
+    assert client.requests[0]["top"] == 5
+
+
+def test_prefilter_profile_returns_text():
+    client = FakeSearchClient(DOCS)
+    engine = SearchEngine(get_profile("filtered_only"), client=client)
+
+    text = engine.search_text("sleep", filter="claps gt 100")
+
+    (request,) = client.requests
+    assert request["filter"] == "claps gt 100"
+    assert request["top"] == 3
+    assert request["search_fields"] == ["chunk"]
+    assert request["select"] == ["chunk"]
+    assert text == "chunk 1\nchunk 2\nchunk 3"
+
+
+def test_hybrid_profile_ignores_filter_and_reranker_can_be_disabled():
+    client = FakeSearchClient(DOCS)
+    profile = SearchProfile.from_dict("hybrid_no_rerank", {"reranker": False}, base=get_profile("hybrid"))
+    engine = SearchEngine(profile, client=client)
+
+    text = engine.search_text("python", filter="claps gt 1")
+
+    (request,) = client.requests
+    assert "filter" not in request
+    assert "query_type" not in request
+    assert "semantic_configuration_name" not in request
+    assert request["select"] == ["id", "title", "subtitle", "content"]
+    assert text.splitlines()[0] == "title 1 | subtitle 1 | content 1"
+
+
+def test_vector_fields_are_only_returned_when_selected():
+    client = FakeSearchClient(DOCS)
+    profile = SearchProfile.from_dict("defaults", {"select": None}, base=get_profile("both"))
+
+    SearchEngine(profile, client=client).search("sleep", filter="claps gt 1")
+
+    hybrid, filtered = client.requests
+    assert hybrid["select"] == filtered["select"] == ["id", "title", "subtitle", "content"]
+
+
+def test_profiles_load_from_json():
+    overrides = {
+        "both": {"candidate_pool": 30},
+        "both_small_k": {"base": "both", "vector_fields": [{"name": "contentVector", "k": 10}]},
+        "chunks": {"filter_strategy": "prefilter", "search_fields": ["chunk"]},
+    }
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+        json.dump(overrides, f)
+    try:
+        profiles = load_profiles(f.name)
+    finally:
+        os.unlink(f.name)
+
+    assert profiles["both"].candidate_pool == 30
+    assert profiles["both_small_k"].candidate_pool == 30  # inherits the overridden base
+    assert profiles["both_small_k"].vector_fields == (VectorField("contentVector", 10),)
+    assert profiles["chunks"].filter_strategy == FILTER_PRE
+    assert profiles["chunks"].search_fields == ("chunk",)
+
+
+def test_unknown_base_profile_is_rejected():
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+        json.dump({"both_small_k": {"base": "bothh", "candidate_pool": 10}}, f)
+    try:
+        load_profiles(f.name)
+    except ValueError as exc:
+        assert "bothh" in str(exc)
+    else:
+        raise AssertionError("a missing base profile should be rejected")
+    finally:
+        os.unlink(f.name)
+
+
+def test_failed_filter_pass_marks_results_unfiltered():
+    upstream = Upstream("stand-in", timeout=2.0, retry=RetryPolicy(max_attempts=1), hedge=False)
+    engine = SearchEngine(get_profile("both"), client=FilterPassDownClient(DOCS), upstream=upstream)
+
+    docs = engine.search("productivity", filter="claps ge 1000")
+
+    assert [doc["id"] for doc in docs] == ["1", "2", "3", "4", "5"]
+    assert "claps ge 1000" in docs.warning
+    assert str(docs).splitlines()[0] == docs.warning
+    assert engine.search_text("productivity", filter="claps ge 1000").splitlines()[0] == docs.warning
+
+
+def test_unknown_profile_settings_are_rejected():
+    for values in ({"filter_strategy": "sometimes"}, {"candidate_pol": 10}):
+        try:
+            SearchProfile.from_dict("bad", values)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"{values} should be rejected")
+